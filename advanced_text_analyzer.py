@@ -1,95 +1,354 @@
 import spacy
+from spacy.attrs import IS_SPACE
+from spacy.tokens import Doc
+from thinc.api import NumpyOps, to_numpy
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import sent_tokenize, word_tokenize
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
+from collections import defaultdict
+import functools
 import random
-import textblob
-import transformers
+import numpy as np
+from textblob.en import sentiment as pattern_sentiment
+
+# Inputs shorter than this (in tokens) use their first sentence as summary;
+# inputs shorter than the second bound get an extractive summary instead
+# of a transformer pass
+SHORT_TEXT_TOKENS = 60
+EXTRACTIVE_SUMMARY_TOKENS = 300
+
+# The small pipeline is within a point of the large one on NER F1
+# (0.845 vs 0.854) at a fraction of the memory and inference time; word
+# vectors are only needed for extractive summaries, so the medium model
+# is loaded lazily for those alone
+SPACY_MODEL = 'en_core_web_sm'
+VECTORS_MODEL = 'en_core_web_md'
+
+SUMMARIZATION_MODEL = "sshleifer/distilbart-xsum-6-6"
+
+# Words that negate the next sentiment word, as in TextBlob's analyzer
+SENTIMENT_NEGATIONS = frozenset(('no', 'not', "n't", 'never'))
+
+INSIGHTS_TEMPLATES = (
+    "The text reveals a complex narrative characterized by {complexity_description}. "
+    "Key entities such as {entities} play a pivotal role in understanding its deeper meaning.",
+    
+    "Diving into the linguistic landscape, we uncover a {sentiment_tone} exploration "
+    "that touches upon critical themes like {key_phrases}.",
+    
+    "This text is a nuanced composition that balances {linguistic_characteristics}, "
+    "offering insights into {thematic_elements}."
+)
+
+def _ensure_nltk(package: str, path: str):
+    """
+    Download an NLTK resource only if it is not already installed
+    """
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(package, quiet=True)
+
+# Download necessary resources once, at import time
+_ensure_nltk('stopwords', 'corpora/stopwords')
+
+@functools.lru_cache(maxsize=None)
+def _load_spacy(name: str):
+    """
+    Load a spaCy model once per process, downloading it if missing
+    """
+    # Run on the GPU when one is available
+    spacy.prefer_gpu()
+    
+    # Lemmas are never used, so the lemmatizer is not even loaded; the
+    # attribute ruler stays since noun_chunks rely on coarse POS tags
+    try:
+        return spacy.load(name, exclude=['lemmatizer'])
+    except OSError:
+        print(f"Downloading spaCy model {name}...")
+        spacy.cli.download(name)
+        return spacy.load(name, exclude=['lemmatizer'])
+
+@functools.lru_cache(maxsize=None)
+def _load_vectors(name: str):
+    """
+    Load only the vocab and word vectors of a spaCy model, downloading it if missing
+    """
+    if not spacy.util.is_package(name):
+        print(f"Downloading spaCy model {name}...")
+        try:
+            spacy.cli.download(name)
+        except SystemExit as e:
+            # spacy.cli reports a failed download by exiting
+            raise OSError(f"Could not download spaCy model {name}") from e
+    
+    # Exclude every pipeline component; only the vocab is needed, and it
+    # stays on the CPU since the lookups feed NumPy directly
+    try:
+        meta = spacy.util.get_model_meta(spacy.util.get_package_path(name))
+    except ImportError as e:
+        raise OSError(f"Could not find spaCy model {name}") from e
+    vocab = spacy.load(name, exclude=meta.get('components', meta['pipeline'])).vocab
+    vocab.vectors.to_ops(NumpyOps())
+    return vocab
+
+@functools.lru_cache(maxsize=None)
+def _load_sentiment_lexicon() -> Dict[str, tuple]:
+    """
+    Map each word in TextBlob's lexicon to its (polarity, subjectivity,
+    intensity, is_modifier) scores
+    """
+    # The None key holds the scores averaged over all parts of speech;
+    # words with an adverb sense modify the next word, as in TextBlob
+    return {
+        word: (scores[None][0], scores[None][1], scores[None][2], 'RB' in scores)
+        for word, scores in pattern_sentiment.items()
+        if None in scores
+    }
+
+@functools.lru_cache(maxsize=None)
+def _load_summarizer():
+    """
+    Load the Hugging Face summarization pipeline once per process, or
+    return None if it cannot be built
+    """
+    # Imported here since torch/transformers are slow to import and only
+    # needed for long inputs
+    try:
+        import torch
+        import transformers
+        
+        if torch.cuda.is_available():
+            return transformers.pipeline("summarization", model=SUMMARIZATION_MODEL, device=0)
+        
+        summarizer = transformers.pipeline("summarization", model=SUMMARIZATION_MODEL, device=-1)
+    except Exception as e:
+        # The None result is cached too, so a failed download or load is
+        # reported once instead of being retried on every long input
+        print(f"Summarization model unavailable, using lead sentences instead: {e}")
+        return None
+    
+    # Dynamic int8 quantization of the linear layers speeds up CPU
+    # inference and roughly halves the model's memory; keep the FP32
+    # model when no quantized backend (fbgemm/qnnpack) is available
+    if set(torch.backends.quantized.supported_engines) - {'none'}:
+        try:
+            summarizer.model = torch.quantization.quantize_dynamic(
+                summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        except RuntimeError as e:
+            print(f"Quantization unavailable, using the FP32 summarization model: {e}")
+    return summarizer
 
 class AdvancedTextAnalyzer:
     def __init__(self, language='en'):
-        # Download necessary resources
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-
         # Load spaCy model
-        try:
-            self.nlp = spacy.load('en_core_web_lg')
-        except OSError:
-            print("Downloading spaCy English large model...")
-            spacy.cli.download('en_core_web_lg')
-            self.nlp = spacy.load('en_core_web_lg')
+        self.nlp = _load_spacy(SPACY_MODEL)
         
-        # Load Hugging Face transformer for advanced NLP
-        self.summarizer = transformers.pipeline("summarization")
+        # Word-level sentiment lookup table
+        self.sentiment_lexicon = _load_sentiment_lexicon()
         
         # Set language-specific resources
         self.stop_words = set(stopwords.words(language))
         self.language = language
 
-    def extract_key_entities(self, text: str) -> Dict[str, List[str]]:
+    @property
+    def summarizer(self):
         """
-        Extract and categorize named entities from the text
+        Hugging Face summarizer, loaded on first use (None if unavailable)
         """
-        doc = self.nlp(text)
-        entities = {}
+        return _load_summarizer()
+
+    def extract_key_entities(self, text: Union[str, Doc]) -> Dict[str, List[str]]:
+        """
+        Extract and categorize named entities from the text or an already parsed Doc
+        """
+        if isinstance(text, Doc):
+            doc = text
+        else:
+            # Only the entity recognizer is needed here; disable the rest per
+            # call, since the pipeline object is shared across sessions
+            doc = self.nlp(text, disable=[name for name in self.nlp.pipe_names if name not in ('tok2vec', 'ner')])
+        entities = defaultdict(list)
         
         for ent in doc.ents:
-            if ent.label_ not in entities:
-                entities[ent.label_] = []
             entities[ent.label_].append(ent.text)
         
-        return entities
+        return dict(entities)
 
-    def sentiment_analysis(self, text: str) -> Dict[str, float]:
+    def sentiment_analysis(self, text: Union[str, Doc]) -> Dict[str, float]:
         """
-        Perform sentiment analysis on the text
+        Perform sentiment analysis on the text or an already parsed Doc
         """
-        blob = textblob.TextBlob(text)
+        # Tokenization is all that is needed, so skip the pipeline for raw text
+        doc = text if isinstance(text, Doc) else self.nlp.make_doc(text)
+        
+        # Walk the tokens applying TextBlob's rules: a modifier ("very")
+        # scales the next known word instead of being averaged on its own,
+        # and a negation ("not") flips and halves the next known word
+        assessments = []  # [polarity, subjectivity, intensity, negated]
+        modifier = None
+        negation = False
+        for token in doc:
+            word = token.lower_
+            entry = self.sentiment_lexicon.get(word)
+            
+            if entry is not None:
+                polarity, subjectivity, intensity, is_modifier = entry
+                if modifier is None:
+                    assessments.append([polarity, subjectivity, intensity, False])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(polarity * last[2], 1.0))
+                    last[1] = max(-1.0, min(subjectivity * last[2], 1.0))
+                    last[2] = intensity
+                if negation:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = True
+                modifier = word if is_modifier else None
+                negation = word in SENTIMENT_NEGATIONS
+                continue
+            
+            if word in SENTIMENT_NEGATIONS:
+                negation = True
+            elif negation and len(word.strip("'")) > 1:
+                # Negations only carry across short words ("not a good")
+                negation = False
+            
+            if negation and modifier is not None and modifier.endswith('ly'):
+                # Negation after an adverb ("really not good")
+                assessments[-1][3] = True
+                negation = False
+            elif modifier is not None and len(word) > 2:
+                # Modifiers only carry across short words ("very a good")
+                modifier = None
+            
+            # Exclamation marks boost the previous word
+            if word == '!' and assessments:
+                assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+        
+        if not assessments:
+            return {'polarity': 0.0, 'subjectivity': 0.0}
+        
+        # "not good" is slightly bad and "not bad" is slightly good
+        polarity = sum(p * -0.5 if negated else p for p, _, _, negated in assessments)
+        subjectivity = sum(s for _, s, _, _ in assessments)
         return {
-            'polarity': blob.sentiment.polarity,
-            'subjectivity': blob.sentiment.subjectivity
+            'polarity': polarity / len(assessments),
+            'subjectivity': subjectivity / len(assessments)
         }
 
+    def _sentence_vectors(self, sentences: List[Any]) -> np.ndarray:
+        """
+        Average the static word vectors of each sentence's tokens
+        """
+        # The parsing model has no static vectors, so look them up in the
+        # vectors model's table by orth ID instead of parsing the text again.
+        # The table is queried directly: the vocab's has_vector/get_vector
+        # need the string in its own StringStore, which rare words are not
+        table = _load_vectors(VECTORS_MODEL).vectors
+        vectors = np.zeros((len(sentences), table.shape[1]), dtype=np.float32)
+        
+        for i, sentence in enumerate(sentences):
+            rows = [to_numpy(table[token.orth]) for token in sentence if token.orth in table]
+            if rows:
+                vectors[i] = np.mean(rows, axis=0)
+        
+        return vectors
+
+    def _textrank(self, sentences: List[Any], top_n: int = 2) -> str:
+        """
+        Build an extractive summary from the most central sentences
+        """
+        if len(sentences) <= top_n:
+            return ' '.join(sentence.text for sentence in sentences)
+        
+        vectors = self._sentence_vectors(sentences)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        similarity = np.clip(vectors @ vectors.T / (norms[:, None] * norms[None, :]), 0.0, None)
+        np.fill_diagonal(similarity, 0.0)
+        scores = np.linalg.matrix_power(similarity, 2).sum(axis=0)
+        
+        # Keep the chosen sentences in their original order
+        best = sorted(np.argsort(scores)[-top_n:])
+        return ' '.join(sentences[i].text for i in best)
+
+    def _summarize(self, text: str, doc: Doc, sentences: List[Any]) -> str:
+        """
+        Summarize the text with the cheapest method that suits its length
+        """
+        lead = sentences[0].text if sentences else text[:200]
+        
+        # Short inputs: the transformer would only echo them back
+        if len(doc) < SHORT_TEXT_TOKENS:
+            return lead
+        
+        if len(doc) < EXTRACTIVE_SUMMARY_TOKENS:
+            try:
+                return self._textrank(sentences)
+            except OSError:
+                # The vectors model is missing and could not be downloaded
+                return lead
+        
+        if self.summarizer is None:
+            return lead
+        
+        try:
+            return self.summarizer(text, max_length=130, min_length=30, do_sample=False, truncation=True)[0]['summary_text']
+        except (RuntimeError, ValueError, IndexError):
+            return lead
+
     def generate_comprehensive_explanation(self, text: str) -> Dict[str, Any]:
         """
         Generate a multi-dimensional analysis of the text
         """
         # Basic text processing
         doc = self.nlp(text)
-        sentences = sent_tokenize(text)
+        sentences = list(doc.sents)
         
-        # Entity extraction
-        entities = self.extract_key_entities(text)
+        # Words per sentence, vectorized: a running count of non-space
+        # tokens read at each sentence boundary. All-whitespace sentences
+        # (e.g. between paragraphs) are skipped
+        words_before = np.concatenate(([0], np.cumsum(doc.to_array(IS_SPACE) == 0)))
+        bounds = np.array([(sentence.start, sentence.end) for sentence in sentences], dtype=np.intp).reshape(-1, 2)
+        sentence_lengths = words_before[bounds[:, 1]] - words_before[bounds[:, 0]]
+        sentence_lengths = sentence_lengths[sentence_lengths > 0]
+        unique_words = {token.lower_ for token in doc if token.is_alpha}
+        
+        # Entity extraction (reuses the parse above)
+        entities = self.extract_key_entities(doc)
         
         # Sentiment analysis
-        sentiment = self.sentiment_analysis(text)
+        sentiment = self.sentiment_analysis(doc)
         
-        # Key phrase extraction
-        noun_chunks = [chunk.text for chunk in doc.noun_chunks]
-        key_phrases = list(set(noun_chunks))[:10]
+        # Key phrase extraction (first 10 unique noun chunks, in order)
+        key_phrases = {}
+        for chunk in doc.noun_chunks:
+            key_phrases.setdefault(chunk.text, None)
+            if len(key_phrases) == 10:
+                break
+        key_phrases = list(key_phrases)
         
         # Text summarization
-        try:
-            summary = self.summarizer(text, max_length=130, min_length=30, do_sample=False)[0]['summary_text']
-        except Exception:
-            summary = sentences[0] if sentences else text[:200]
+        summary = self._summarize(text, doc, sentences)
         
         # Advanced linguistic breakdown
         linguistic_analysis = {
-            'total_words': len(word_tokenize(text)),
-            'unique_words': len(set(word.lower() for word in word_tokenize(text) if word.isalnum())),
-            'avg_sentence_length': sum(len(word_tokenize(sentence)) for sentence in sentences) / len(sentences)
+            'total_words': int(sentence_lengths.sum()),
+            'unique_words': len(unique_words),
+            'avg_sentence_length': float(sentence_lengths.mean()) if sentence_lengths.size else 0.0
         }
         
         # Comprehensive explanation generation
+        total_entities = sum(map(len, entities.values()))
+        entity_categories = ', '.join(list(entities)[:8])
         explanation_components = [
             f"Linguistic Overview: The text contains {linguistic_analysis['total_words']} words "
             f"with an average sentence length of {linguistic_analysis['avg_sentence_length']:.2f}.",
             
-            f"Key Entities: Discovered {sum(len(entities.get(k, [])) for k in entities)} significant entities "
-            f"across categories like {', '.join(entities.keys())}.",
+            f"Key Entities: Discovered {total_entities} significant entities "
+            f"across categories like {entity_categories}.",
             
             f"Sentiment Analysis: The text has a polarity of {sentiment['polarity']:.2f} "
             f"({'positive' if sentiment['polarity'] > 0 else 'negative' if sentiment['polarity'] < 0 else 'neutral'}) "
@@ -109,35 +368,26 @@ class AdvancedTextAnalyzer:
             'summary': summary
         }
 
-    def generate_advanced_insights(self, text: str) -> str:
+    def generate_advanced_insights(self, text: str, analysis: Dict[str, Any] = None) -> str:
         """
-        Generate advanced insights with narrative explanation
+        Generate advanced insights with narrative explanation, reusing a
+        precomputed analysis when one is given
         """
-        analysis = self.generate_comprehensive_explanation(text)
-        
-        insights_templates = [
-            "The text reveals a complex narrative characterized by {complexity_description}. "
-            "Key entities such as {entities} play a pivotal role in understanding its deeper meaning.",
-            
-            "Diving into the linguistic landscape, we uncover a {sentiment_tone} exploration "
-            "that touches upon critical themes like {key_phrases}.",
-            
-            "This text is a nuanced composition that balances {linguistic_characteristics}, "
-            "offering insights into {thematic_elements}."
-        ]
+        if analysis is None:
+            analysis = self.generate_comprehensive_explanation(text)
         
         # Generate dynamic insights
         complexity_desc = 'intricate linguistic patterns' if analysis['linguistic_analysis']['avg_sentence_length'] > 15 else 'concise communication'
         sentiment_tone = 'emotionally charged' if abs(analysis['sentiment']['polarity']) > 0.5 else 'balanced'
         
-        insights = random.choice(insights_templates).format(
-            complexity_description=complexity_desc,
-            entities=', '.join(analysis['entities'].get('PERSON', [])[:3]),
-            sentiment_tone=sentiment_tone,
-            key_phrases=', '.join(analysis['key_phrases'][:3]),
-            linguistic_characteristics='brevity and depth',
-            thematic_elements='contemporary discourse'
-        )
+        insights = random.choice(INSIGHTS_TEMPLATES).format_map({
+            'complexity_description': complexity_desc,
+            'entities': ', '.join(analysis['entities'].get('PERSON', [])[:3]),
+            'sentiment_tone': sentiment_tone,
+            'key_phrases': ', '.join(analysis['key_phrases'][:3]),
+            'linguistic_characteristics': 'brevity and depth',
+            'thematic_elements': 'contemporary discourse'
+        })
         
         return insights
 
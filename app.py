@@ -1,29 +1,132 @@
 import streamlit as st
 import base64
+import hashlib
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from advanced_text_analyzer import AdvancedTextAnalyzer
-from gtts import gTTS
 import os
 
+# Temporary files older than this (in seconds) were left behind by a
+# failed or interrupted write and are safe to delete
+STALE_TEMP_FILE_AGE = 600
+
 class TextToSpeechGenerator:
-    def __init__(self, output_dir='audio_outputs'):
+    def __init__(self, output_dir='audio_outputs', max_workers=4, max_files=256):
         self.output_dir = output_dir
+        self.max_workers = max_workers
+        if max_files < 1:
+            raise ValueError("max_files must be at least 1")
+        self.max_files = max_files
         os.makedirs(output_dir, exist_ok=True)
     
+    def _evict_stale_files(self):
+        """
+        Keep only the most recently used audio files in the output directory
+        and remove abandoned temporary files
+        """
+        stale_before = time.time() - STALE_TEMP_FILE_AGE
+        entries = []
+        for entry in os.scandir(self.output_dir):
+            try:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith('.mp3'):
+                    entries.append((entry.stat().st_mtime, entry.path))
+                # Recent temporary files may still be being written by another session
+                elif entry.name.endswith('.tmp') and entry.stat().st_mtime < stale_before:
+                    os.remove(entry.path)
+            except OSError:
+                # Another session may have removed it concurrently
+                continue
+        
+        entries.sort()
+        for _, path in entries[:max(len(entries) - self.max_files, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                # Another session may have removed it concurrently
+                continue
+    
+    def _synthesize(self, text, language):
+        """
+        Synthesize a single chunk of text to MP3 bytes
+        """
+        from gtts import gTTS
+        
+        buffer = BytesIO()
+        gTTS(text=text, lang=language).write_to_fp(buffer)
+        return buffer.getvalue()
+    
     def generate_speech(self, text, language='en'):
         """
         Generate speech from text using Google Text-to-Speech
         """
-        filename = f"speech_{language}_{hash(text)}.mp3"
+        # Stable content hash, so identical text maps to the same file across restarts
+        text_hash = hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+        filename = f"speech_{language}_{text_hash}.mp3"
         file_path = os.path.join(self.output_dir, filename)
         
+        # Reuse audio already synthesized for this text
+        try:
+            if os.path.getsize(file_path) > 0:
+                # Refresh the timestamp so eviction treats this file as recently used
+                os.utime(file_path)
+                return file_path
+        except OSError:
+            # Not synthesized yet, or evicted by another session since; synthesize it again
+            pass
+        
+        # Synthesize paragraphs concurrently; MP3 frames concatenate cleanly,
+        # so the parts can simply be joined in order
+        chunks = [chunk for chunk in re.split(r'\n\s*\n', text) if chunk.strip()] or [text]
+        
         try:
-            tts = gTTS(text=text, lang=language)
-            tts.save(file_path)
+            with ThreadPoolExecutor(max_workers=min(len(chunks), self.max_workers)) as executor:
+                audio = b''.join(executor.map(lambda chunk: self._synthesize(chunk, language), chunks))
+            
+            # Write to a temporary file and move it into place, so other
+            # sessions never see a partially written MP3 as a cache hit
+            audio_file = tempfile.NamedTemporaryFile(dir=self.output_dir, suffix='.tmp', delete=False)
+            try:
+                with audio_file:
+                    audio_file.write(audio)
+                os.replace(audio_file.name, file_path)
+            except BaseException:
+                try:
+                    os.remove(audio_file.name)
+                except OSError:
+                    pass
+                raise
+            self._evict_stale_files()
             return file_path
         except Exception as e:
             st.error(f"Speech generation error: {e}")
             return None
 
+@st.cache_resource(show_spinner="Loading language models...")
+def get_analyzer():
+    """
+    Build the text analyzer once and share it across reruns and sessions
+    """
+    return AdvancedTextAnalyzer()
+
+@st.cache_resource
+def get_tts():
+    """
+    Build the speech generator once and share it across reruns and sessions
+    """
+    return TextToSpeechGenerator()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def analyze_text(text):
+    """
+    Run the comprehensive analysis, memoized on the input text
+    """
+    return get_analyzer().generate_comprehensive_explanation(text)
+
 def download_button(object_to_download, download_filename, button_text):
     """
     Generates a link to download the given object_to_download.
@@ -89,14 +192,14 @@ def main():
             st.warning("Please provide more substantial text for meaningful analysis.")
             return
         
-        # Initialize analyzers
-        text_analyzer = AdvancedTextAnalyzer()
-        tts_generator = TextToSpeechGenerator()
+        # Initialize analyzers (cached across reruns)
+        text_analyzer = get_analyzer()
+        tts_generator = get_tts()
         
         try:
             # Comprehensive analysis
-            analysis_result = text_analyzer.generate_comprehensive_explanation(input_text)
-            advanced_insights = text_analyzer.generate_advanced_insights(input_text)
+            analysis_result = analyze_text(input_text)
+            advanced_insights = text_analyzer.generate_advanced_insights(input_text, analysis_result)
             
             # Display results in tabs
             tab1, tab2, tab3 = st.tabs(["📊 Analysis Overview", "🧠 Advanced Insights", "🎙️ Audio"])